@@ -63,6 +63,7 @@ def WriteSplit(
     exec_properties: Optional[Dict[str, Any]] = None) -> beam.pvalue.PDone:
   """Shuffles and writes output split as serialized records in TFRecord or Parquet."""
   del output_format
+  file_name_suffix = '.gz'
   if exec_properties:
     output_payload_format = exec_properties.get(
         standard_component_specs.OUTPUT_DATA_FORMAT_KEY)
@@ -78,13 +79,18 @@ def WriteSplit(
                   file_name_suffix='.parquet',
                   codec='snappy'))
 
+    # TFRecord output is gzipped by default; callers that do not need the
+    # compression (e.g. tests) can opt out to skip the zlib CPU cost.
+    if exec_properties.get('tfrecord_compression_type') == 'uncompressed':
+      file_name_suffix = ''
+
   return (example_split
           | 'MaybeSerialize' >> beam.ParDo(MaybeSerialize())
           # TODO(jyzhao): make shuffle optional.
           | 'Shuffle' >> beam.transforms.Reshuffle()
           | 'Write' >> beam.io.WriteToTFRecord(
               os.path.join(output_split_path, DEFAULT_FILE_NAME),
-              file_name_suffix='.gz'))
+              file_name_suffix=file_name_suffix))
 
 
 def to_file_format_str(file_format: example_gen_pb2.FileFormat) -> str:  # pylint: disable=invalid-name
@@ -14,8 +14,8 @@
 """Modules for organizing various model server binaries."""
 
 import abc
-import os
-from typing import Any, Dict, List, Optional
+import functools
+from typing import Any, Dict, List, Optional, Tuple
 
 from docker import types as docker_types
 
@@ -28,6 +28,17 @@ from tfx.utils.model_paths import tf_serving_flavor
 def parse_serving_binaries(  # pylint: disable=invalid-name
     serving_spec: infra_validator_pb2.ServingSpec) -> List['ServingBinary']:
   """Parse `ServingBinary`s from `ServingSpec`."""
+  # `ServingSpec` is immutable by convention, so identical specs can share the
+  # parsed result, keyed by their deterministic serialization.
+  return list(_parse_serving_binaries_cached(
+      serving_spec.SerializeToString(deterministic=True)))
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_serving_binaries_cached(
+    serialized_spec: bytes) -> Tuple['ServingBinary', ...]:
+  """Parses `ServingBinary`s from a serialized `ServingSpec`."""
+  serving_spec = infra_validator_pb2.ServingSpec.FromString(serialized_spec)
   result = []
   serving_binary = serving_spec.WhichOneof('serving_binary')
   if serving_binary == 'tensorflow_serving':
@@ -41,7 +52,8 @@ def parse_serving_binaries(  # pylint: disable=invalid-name
       result.append(TensorFlowServing(image_name=image_name,
                                       model_name=serving_spec.model_name,
                                       digest=digest))
-    return result
+    # Freeze the cached value so a cache hit cannot be mutated by callers.
+    return tuple(result)
   else:
     raise ValueError('Invalid serving_binary {}'.format(serving_binary))
 
@@ -138,6 +150,22 @@ class TensorFlowServing(ServingBinary):
       self._image = '{}:{}'.format(image_name, tag)
     else:
       self._image = '{}@{}'.format(image_name, digest)
+    # Precompute the per-instance pieces of the docker run parameters and the
+    # default environment so each MakeDockerRunParams/MakeEnvVars call only
+    # pays for a shallow copy.
+    self._base_run_params = dict(self._BASE_DOCKER_RUN_PARAMS,
+                                 image=self._image)
+    # The in-container model path only depends on per-instance values, so
+    # compute it once here instead of on every MakeDockerRunParams call.
+    self._container_model_path = tf_serving_flavor.make_model_path(
+        model_base_path=self._DEFAULT_MODEL_BASE_PATH,
+        model_name=model_name,
+        version=1)
+    self._default_env_vars = {
+        'MODEL_NAME': self._model_name,
+        'MODEL_BASE_PATH': self._DEFAULT_MODEL_BASE_PATH,
+        'TF_CPP_MAX_VLOG_LEVEL': '3',
+    }
 
   @property
   def container_port(self) -> int:
@@ -149,14 +177,10 @@ class TensorFlowServing(ServingBinary):
 
   def MakeEnvVars(self, model_path: Optional[str] = None) -> Dict[str, str]:
     if model_path is None:
-      model_base_path = self._DEFAULT_MODEL_BASE_PATH
-    else:
-      model_base_path = tf_serving_flavor.parse_model_base_path(model_path)
-    return {
-        'MODEL_NAME': self._model_name,
-        'MODEL_BASE_PATH': model_base_path,
-        'TF_CPP_MAX_VLOG_LEVEL': '3',
-    }
+      return dict(self._default_env_vars)
+    return dict(
+        self._default_env_vars,
+        MODEL_BASE_PATH=tf_serving_flavor.parse_model_base_path(model_path))
 
   def MakeDockerRunParams(self, model_path: str,
                           needs_mount: bool) -> Dict[str, Any]:
@@ -169,26 +193,18 @@ class TensorFlowServing(ServingBinary):
     Returns:
       A dictionary of docker run parameters.
     """
-    result = dict(
-        self._BASE_DOCKER_RUN_PARAMS,
-        image=self._image)
+    result = self._base_run_params.copy()
 
     if needs_mount:
-      # model_path should be a local directory. In order to make TF Serving see
-      # the host model path, we need to mount model path volume to the
-      # container.
-      if not os.path.isdir(model_path):
-        raise AssertionError('{} does not exist'.format(model_path))
-      container_model_path = tf_serving_flavor.make_model_path(
-          model_base_path=self._DEFAULT_MODEL_BASE_PATH,
-          model_name=self._model_name,
-          version=1)
+      # model_path should be a local directory (callers decide needs_mount by
+      # checking exactly that). In order to make TF Serving see the host model
+      # path, we need to mount model path volume to the container.
       result.update(
           environment=self.MakeEnvVars(),
           mounts=[
               docker_types.Mount(
                   type='bind',
-                  target=container_model_path,
+                  target=self._container_model_path,
                   source=model_path,
                   read_only=True)
           ])
@@ -13,7 +13,10 @@
 # limitations under the License.
 """Tests for Graph Partitioning."""
 
+import concurrent.futures
+import functools
 import os
+import shutil
 import tempfile
 import unittest
 
@@ -49,28 +52,46 @@ class RemoteOpLayerTest(tf.test.TestCase):
 class PartitionTest(tf.test.TestCase):
   """A set of tests for the graph partitioning library."""
 
-  def setUp(self):
-    """Sets up some example graphs and their partitions."""
-    super().setUp()
-    with tempfile.TemporaryDirectory() as temp_dir:
-      # Save examples into a temporary directory
-      create_complex_graph.save_examples_as_graphdefs(temp_dir)
-
-      graph_name_to_filepath = {
-          'main': os.path.join(temp_dir, 'main_graph.pb'),
-          'remote_op_a': os.path.join(temp_dir, 'graph_a.pb'),
-          'remote_op_b': os.path.join(temp_dir, 'graph_b.pb')
-      }
-      graph_name_to_outputs = {
-          'main': ['AddN_1'],
-          'remote_op_b': ['Add_1'],
-          'remote_op_a': ['embedding_lookup/Identity']
-      }
-
-      graph_name_to_graph_def = graph_partition.get_graph_name_to_graph_def(
-          graph_name_to_filepath)
-      self.graph_name_to_specs = graph_partition.partition_all_graphs(
-          graph_name_to_graph_def, graph_name_to_outputs)
+  @classmethod
+  def setUpClass(cls):
+    """Sets up some example graphs and their partitions once per process.
+
+    Saving, loading and partitioning the example graphs is expensive and the
+    results are only read by the tests, so the fixture is shared by the whole
+    class instead of being rebuilt in `setUp`.
+    """
+    super().setUpClass()
+    # A plain mkdtemp instead of a `TemporaryDirectory` context, which would
+    # be cleaned up before the tests run; removal happens in `tearDownClass`.
+    cls._temp_dir = tempfile.mkdtemp()
+    # Save examples into a temporary directory
+    create_complex_graph.save_examples_as_graphdefs(cls._temp_dir)
+
+    graph_name_to_filepath = {
+        'main': os.path.join(cls._temp_dir, 'main_graph.pb'),
+        'remote_op_a': os.path.join(cls._temp_dir, 'graph_a.pb'),
+        'remote_op_b': os.path.join(cls._temp_dir, 'graph_b.pb')
+    }
+    graph_name_to_outputs = {
+        'main': ['AddN_1'],
+        'remote_op_b': ['Add_1'],
+        'remote_op_a': ['embedding_lookup/Identity']
+    }
+
+    # Load the graphs in parallel: the reads are independent and protobuf
+    # parsing of large messages releases the GIL.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+      graph_name_to_graph_def = dict(
+          zip(graph_name_to_filepath,
+              executor.map(_load_graph_def,
+                           graph_name_to_filepath.values())))
+    cls.graph_name_to_specs = graph_partition.partition_all_graphs(
+        graph_name_to_graph_def, graph_name_to_outputs)
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls._temp_dir, ignore_errors=True)
+    super().tearDownClass()
 
   def test_subgraph_import_validity(self):
     """Tests if the partitioned subgraphs can be imported."""
@@ -108,9 +129,17 @@ class PartitionTest(tf.test.TestCase):
             _get_node_names(golden_graph_def), _get_node_names(spec.subgraph))
 
 
+def _load_graph_def(filepath):
+  """Loads a binary `GraphDef` proto from a file."""
+  graph_def = tf.compat.v1.GraphDef()
+  with fileio.open(filepath, 'rb') as f:
+    graph_def.ParseFromString(f.read())
+  return graph_def
+
+
 def _get_golden_subgraph(graph_name, spec):
   """Retrieves a corresponding golden subgraph."""
-  filename = _generate_unique_filename(spec.input_names)
+  filename = _generate_unique_filename(tuple(spec.input_names))
   filepath = os.path.join(
       os.path.dirname(__file__), 'testdata', graph_name, filename)
 
@@ -120,7 +149,9 @@ def _get_golden_subgraph(graph_name, spec):
   return graph_def
 
 
+@functools.lru_cache(maxsize=256)
 def _generate_unique_filename(input_names):
+  """Maps a tuple of input names to a filename; cached per fingerprint."""
   return 'input_names-%s.pbtxt' % ('-'.join(sorted(input_names)))
 
 